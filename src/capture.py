@@ -0,0 +1,256 @@
+import math
+import time
+import numpy
+from numpy import ndarray  # to keep annotations shorter
+from mss import mss
+from collections import deque
+from threading import Condition, Event, Thread
+from dataclasses import dataclass  # dataclasses are effectively structs
+
+### SCREEN CAPTURE
+# frames are grabbed on a thread of their own, so a slow frame (like OCR spiking when a
+# battle starts) delays reading the next frame, but never capturing it -- optionally
+# only the regions that are read are grabbed (the rest of the frame is left black), and
+# how often frames are grabbed can follow what the game is doing (see `PollScheduler`)
+
+
+@dataclass
+class Frame:
+    """a captured (and downscaled) frame of the game"""
+
+    image: ndarray
+    """the frame, downscaled to the game's resolution (3 channels, no alpha)"""
+
+    time: float
+    """when the frame was grabbed (time.perf_counter() seconds)"""
+
+    number: int
+    """how many frames were grabbed before this one"""
+
+
+class FrameCapture:
+    """
+    grabs frames of the capture window on a background thread into a bounded ring --
+    the model is always handed the freshest frame, and frames that were pushed out of
+    the ring (or skipped over) before being handed out are counted as dropped
+    """
+
+    def __init__(
+        self, bounding_box: dict, scaling: int, size: int = 2, interval: float = 0
+    ):
+        self.bounding_box = bounding_box
+        """the part of the screen that is captured (see `mss.grab()`)"""
+        self.scaling = scaling
+        """how many screenshot pixels wide (and tall) each pixel of the game is"""
+        self.density = 1.0
+        """screenshot pixels per point of the bounding box (2 on retina displays)
+        -- measured from the first grab"""
+        self.shape = (0, 0, 3)
+        """shape of the downscaled frames -- measured from the first grab"""
+        self.interval = interval
+        """least seconds between the start of two grabs (0 grabs as fast as possible)"""
+        self.captured = 0
+        """how many frames were grabbed"""
+        self.delivered = 0
+        """how many frames were handed out by latest()"""
+        self.dropped = 0
+        """how many frames were never handed out (a newer frame was handed out instead)"""
+        self._regions: list[tuple[slice, slice]] | None = None
+        """(rows, columns) of each region grabbed (None grabs the whole bounding box)
+        -- swapped as a whole by set_regions()"""
+        self._boxes: tuple[list | None, list] = None, []
+        """the regions the boxes were mapped from, and (rows, columns, screen box, pixel
+        offset) of each (see `_map_regions()`) -- only used on the capture thread"""
+        self._ring: deque[Frame] = deque(maxlen=max(1, size))
+        self._ready = Condition()  # notified whenever a frame is added to the ring
+        self._stopped = Event()
+        self._woken = Event()  # set when the thread shouldn't keep waiting for a grab
+        self._error: Exception | None = None  # raised by latest() if grabbing failed
+        self._thread = Thread(target=self._run, name="capture", daemon=True)
+
+    def __repr__(self):
+        captured, delivered, dropped = self.captured, self.delivered, self.dropped
+        return f"FrameCapture(size={self._ring.maxlen}, {captured=}, {delivered=}, {dropped=})"
+
+    def start(self):
+        """starts grabbing frames in the background"""
+        self._thread.start()
+
+    def stop(self):
+        """stops grabbing frames (waits for the frame being grabbed, if any)"""
+        self._stopped.set()
+        self._woken.set()
+        self._thread.join()
+
+    def set_interval(self, interval: float):
+        """
+        Sets the least seconds between the start of two grabs (0 grabs as fast as
+        possible) -- takes effect right away, even while waiting for the next grab
+        """
+        if interval != self.interval:
+            self.interval = interval
+            self._woken.set()
+
+    def set_regions(self, regions: list[tuple[slice, slice]] | None):
+        """
+        Sets which (rows, columns) of the downscaled frame are grabbed from now on -- each
+        is mapped back to the screen through the scaling factor, and grabbed on its own
+        -- None grabs the whole bounding box again
+        """
+        # a single assignment, so the thread never sees half of it
+        self._regions = regions
+
+    def latest(self, timeout: float | None = None) -> Frame | None:
+        """
+        returns the freshest frame that hasn't been handed out yet, waiting for one if
+        there isn't any -- older frames in the ring are dropped
+        -- None if no frame was grabbed before `timeout` seconds passed
+        """
+        with self._ready:
+            if not self._ready.wait_for(lambda: self._ring or self._error, timeout):
+                return None
+            if self._error is not None:
+                raise self._error
+            frame = self._ring.pop()
+            self.dropped += len(self._ring)
+            self._ring.clear()
+            self.delivered += 1
+            return frame
+
+    def _run(self):
+        """grabs frames until stopped (mss instances can't be shared between threads)"""
+        try:
+            with mss() as sct:
+                # the bounding box is in points, which aren't always screenshot pixels
+                shot = sct.grab(self.bounding_box)
+                self.density = shot.width / self.bounding_box["width"]
+                self.shape = self._downscale(shot).shape
+                while not self._stopped.is_set():
+                    started = time.perf_counter()
+                    frame = Frame(self._grab(sct), started, self.captured)
+                    with self._ready:
+                        if len(self._ring) == self._ring.maxlen:
+                            self.dropped += 1  # the oldest frame is pushed out
+                        self._ring.append(frame)
+                        self.captured += 1
+                        self._ready.notify()
+                    self._wait(started)
+        except Exception as error:
+            # the main loop would otherwise wait for a frame forever
+            with self._ready:
+                self._error = error
+                self._ready.notify()
+
+    def _wait(self, started: float):
+        """helper for _run() -- waits until the interval after a grab has passed"""
+        while not self._stopped.is_set():
+            remaining = self.interval - (time.perf_counter() - started)
+            if remaining <= 0:
+                return
+            # woken early when the interval changes (or capture stops)
+            self._woken.wait(remaining)
+            self._woken.clear()
+
+    def _grab(self, sct) -> ndarray:
+        """
+        grabs a single frame (or the regions of it set by set_regions()) downscaled
+        -- a whole frame is a view of the screenshot, so nothing is copied until a
+        region of it is read (a new buffer is allocated for every screenshot)
+        """
+        regions = self._regions
+        if regions is None:
+            return self._downscale(sct.grab(self.bounding_box))
+        if self._boxes[0] is not regions:
+            self._boxes = regions, self._map_regions(regions)
+        frame = numpy.zeros(self.shape, dtype=numpy.uint8)
+        for rows, cols, box, offset in self._boxes[1]:
+            frame[rows, cols] = self._downscale(sct.grab(box), offset)[
+                : rows.stop - rows.start, : cols.stop - cols.start
+            ]
+        return frame
+
+    def _map_regions(self, regions: list[tuple[slice, slice]]) -> list:
+        """
+        helper for _grab()
+        -- maps (rows, columns) of the downscaled frame to the screen box (in points)
+        covering them, and the offset of their first pixel in that box's screenshot
+        """
+        boxes = []
+        for rows, cols in regions:
+            rows = slice(*rows.indices(self.shape[0])[:2])
+            cols = slice(*cols.indices(self.shape[1])[:2])
+            if rows.stop <= rows.start or cols.stop <= cols.start:
+                continue
+            box, offset = dict(), []
+            for axis, span in (("top", rows), ("left", cols)):
+                size = "height" if axis == "top" else "width"
+                # points are rounded outwards, so the box covers every pixel needed
+                start = math.floor(span.start * self.scaling / self.density)
+                stop = math.ceil(span.stop * self.scaling / self.density)
+                box[axis] = self.bounding_box[axis] + start
+                box[size] = stop - start
+                offset.append(span.start * self.scaling - round(start * self.density))
+            boxes.append((rows, cols, box, tuple(offset)))
+        return boxes
+
+    def _downscale(self, shot, offset: tuple[int, int] = (0, 0)) -> ndarray:
+        """
+        helper for _grab()
+        -- views a screenshot without its alpha, downscaled by the scaling factor
+        (starting from the pixel at `offset`)
+        -- nearest neighbour downscaling by an integer factor only keeps every n-th pixel
+        (the same pixels opencv.resize() with INTER_NEAREST keeps), so it's a strided view
+        """
+        gbra = numpy.frombuffer(shot.raw, dtype=numpy.uint8)
+        gbra = gbra.reshape(shot.height, shot.width, 4)
+        top, left = offset
+        img = gbra[top :: self.scaling, left :: self.scaling, :3]  # discard alpha too
+        height = round((shot.height - top) / self.scaling)
+        width = round((shot.width - left) / self.scaling)
+        return img[:height, :width]
+
+
+class PollScheduler:
+    """
+    picks how often frames are captured for each view type -- slowly while not much can
+    happen (like in the PC box), quickly where text comes and goes fast (like in battle),
+    and in a burst right after the view type changes (like when "A wild ... appeared")
+    """
+
+    def __init__(
+        self,
+        rates: dict,
+        default: float,
+        burst: float = 0,
+        burst_seconds: float = 0,
+    ):
+        self.rates = rates
+        """frames per second to capture in each view type (0 is as fast as possible)"""
+        self.default = default
+        """frames per second to capture in view types without a rate of their own"""
+        self.burst = burst
+        """frames per second to capture for a while after the view type changes"""
+        self.burst_seconds = burst_seconds
+        """how long a burst lasts (0 never bursts)"""
+        self._view = None
+        self._burst_until = 0.0
+
+    def __repr__(self):
+        rates, default, burst = self.rates, self.default, self.burst
+        return f"PollScheduler({rates=}, {default=}, {burst=})"
+
+    def interval(self, view) -> float:
+        """
+        The least seconds between captures in a view type (see `FrameCapture.set_interval()`)
+        -- a change from the view type last asked about starts a burst
+        """
+        now = time.perf_counter()
+        if view != self._view:
+            if self._view is not None:
+                self._burst_until = now + self.burst_seconds
+            self._view = view
+        if now < self._burst_until:
+            fps = self.burst
+        else:
+            fps = self.rates.get(view, self.default)
+        return 1.00 / fps if fps > 0 else 0
@@ -1,86 +1,692 @@
 from itertools import chain
-from collections import deque
-import cv2 as opencv
+from collections import deque, OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from threading import Lock
+import hashlib
+import json
 import numpy
 from numpy import ndarray  # to keep annotations shorter
 from enum import Enum
 from dataclasses import dataclass, field  # dataclasses are effectively structs
 from font import *
-
+from matching import *
 
 ### MODEL-AGNOSTIC TEXT PARSING
 
 
-def parse_text(region: ndarray, chardata: char_dataset, masked: bool = False):
+def parse_text(
+    region: ndarray,
+    chardata: char_dataset,
+    masked: bool = False,
+    engine: MatchEngine | None = None,
+    executor: Executor | None = None,
+):
     """
     Takes a cropped region of an image and parses it for text that matches the characters passed to it.
 
-    `region` : a portion of a 3-channel image, whose height should be a multiple of 16\n
+    `region` : a portion of a 3-channel image, whose height should be a multiple of 16
+    (converted to luminance if the glyphs are, see `match_channels()`)\n
     `chardata` : an iterable associating characters with their image/mask data\n
-    `threshold` (optional) : a minimum correlation for it to match when parsed\n
+    `masked` (optional) : whether glyphs should only be compared under their masks\n
+    `engine` (optional) : which glyph scoring engine to use (see `set_ocr_engine()`)\n
+    `executor` (optional) : if given, rows are parsed concurrently on it (see `submit_text()`)\n
+    """
+    region = match_channels(region, chardata)
+    if not ink_columns(region, chardata).any():
+        return []  # nothing to read (which is most of the time)
+    if executor is not None:
+        return submit_text(executor, region, chardata, masked, engine)()
+    results = [
+        parse_text_row(haystack, chardata, masked, engine)
+        for haystack in _split_rows(region)
+    ]
+    return list(chain(*results))
+
+
+def submit_text(
+    executor: Executor,
+    region: ndarray,
+    chardata: char_dataset,
+    masked: bool = False,
+    engine: MatchEngine | None = None,
+) -> Callable[[], list[str]]:
+    """
+    Submits every row of a region to the executor to be parsed concurrently
+    see `parse_text()` for parameters -- returns a function that waits for all rows
+    and joins their results in order (the same list parse_text() would return)
+    """
+    region = match_channels(region, chardata)
+    if not ink_columns(region, chardata).any():
+        return lambda: []  # nothing to read
+    # opencv.matchTemplate and numpy's matrix products release the GIL while matching
+    futures = [
+        executor.submit(parse_text_row, haystack, chardata, masked, engine)
+        for haystack in _split_rows(region)
+    ]
+    return lambda: list(chain(*(future.result() for future in futures)))
+
+
+def match_channels(region: ndarray, chardata: char_dataset) -> ndarray:
     """
+    Converts a region to the same color space as the glyphs of a char_dataset
+    -- only luminance needs converting (see `palette_transfer()`)
+    """
+    if chardata[0][2].shape[2] == 1 and region.shape[2] == 3:
+        return to_luminance(region)
+    return region
+
+
+def _split_rows(region: ndarray):
+    """helper for parse_text() -- splits a region into its 16px rows of text"""
     ROW_HEIGHT = 16
     # set up rows and haystacks
     rows, leftover_region = divmod(region.shape[0], ROW_HEIGHT)
     assert leftover_region == 0  # full rows of text (should be aligned)
     assert region.ndim == 3  # 3-channel image
-    # split by row (was supposed to be parallelized)
-    stacks = [region[ROW_HEIGHT * i : ROW_HEIGHT * (i + 1)] for i in range(rows)]
-    results = [parse_text_row(haystack, chardata, masked) for haystack in stacks]
-    return list(chain(*results))
+    return [region[ROW_HEIGHT * i : ROW_HEIGHT * (i + 1)] for i in range(rows)]
 
 
-def parse_text_row(haystack: ndarray, chardata: char_dataset, masked: bool = False):
+def parse_text_row(
+    haystack: ndarray,
+    chardata: char_dataset,
+    masked: bool = False,
+    engine: MatchEngine | None = None,
+):
     """
     Processes a single row of text -- parse_text() calls this function under the hood
     see `parse_text()` for parameters -- mildly faster than parse_text() for single-row
     """
-    # negative indices don't show up naturally
-    UNASSIGNED = -1
-    OCCUPIED = -2
-
-    chars, char_sizes, char_scores = [], [], []
-    # iterate over characters, associate them with match scores
-    for _, char, needle, mask in chardata:
-        chars.append(char)  # character being matched
-        char_sizes.append(needle.shape[1])  # width of character (height is fixed)
-        score = opencv.matchTemplate(
-            haystack, needle, opencv.TM_CCOEFF_NORMED, None, mask if masked else None
-        ).flat  # vertical axis is unnecessary, row height is fixed
-        char_scores.append(
-            # fixing the size to be consistent (pad with lowest normed score)
-            numpy.pad(score, (0, needle.shape[1] - 1), constant_values=-1)
-        )
-    char_scores = numpy.array(char_scores)
+    if engine is None:
+        engine = _ocr_engine
+    haystack = match_channels(haystack, chardata)
+
+    # the same text tends to stay on screen (or come back) for many frames
+    cache = _ocr_cache
+    if cache is not None:
+        key = cache.key(haystack, chardata, masked, engine)
+        words = cache.get(key)
+        if words is not None:
+            return words
 
     # get indices of strongest char match in each position
-    maxima, indices = char_scores.max(axis=0), char_scores.argmax(axis=0)
-    # discount matches weaker than the threshold
-    matches = numpy.where(maxima > 0.95, indices, UNASSIGNED)
+    maxima, indices = score_row(haystack, chardata, masked, engine)
+    words = assemble_words(maxima, indices, chardata)
 
-    # block out overlapping matches
-    for (x,), i in numpy.ndenumerate(matches):
-        # x is a horizontal position for char_matches
-        # i is an index in char_data that (x,) corresponds to
-        if i < 0:  # if i == UNASSIGNED or i == OCCUPIED:
-            continue
-        char_width = char_sizes[i]
-        # block out the full region, but leave the original pixel
-        matches[x + 1 : x + char_width] = OCCUPIED
-
-    # stringify from matches
-    words = []
-    current_word = ""
-    for (x,), i in numpy.ndenumerate(matches):
-        if i == UNASSIGNED and current_word != "":
-            words.append(current_word)
-            current_word = ""
-        if i < 0:  # if i == UNASSIGNED or i == OCCUPIED:
-            continue
-        current_word = current_word + chars[i]
+    if cache is not None:
+        cache.put(key, words, chardata)
     return words
 
 
+@dataclass(frozen=True)
+class ScoredWord:
+    """a word read from a row of text, with how confidently each glyph was matched"""
+
+    text: str
+    """the characters of the word"""
+
+    row: int
+    """which row of the region the word is in"""
+
+    offsets: tuple[int, ...]
+    """x of each glyph in the row"""
+
+    scores: tuple[float, ...]
+    """match score of each glyph (1.0 is a perfect match)"""
+
+    @property
+    def x(self) -> int:
+        """x the word starts at in the row"""
+        return self.offsets[0]
+
+    @property
+    def confidence(self) -> float:
+        """score of the weakest glyph"""
+        return min(self.scores)
+
+    @property
+    def mean_confidence(self) -> float:
+        """mean score of the glyphs"""
+        return sum(self.scores) / len(self.scores)
+
+
+def parse_text_batch(
+    regions: list[ndarray],
+    chardata: char_dataset,
+    masked: bool = False,
+    engine: MatchEngine | None = None,
+) -> list[list[str]]:
+    """
+    Same as parse_text() on each region, but every row that isn't cached is scored in a
+    single batch (see `score_rows()`) -- worth it for several small regions that are read
+    with the same charset, returns the words of each region in order
+    """
+    if engine is None:
+        engine = _ocr_engine
+    haystacks = [
+        (region, haystack)
+        for region, whole in enumerate(regions)
+        for haystack in _split_rows(match_channels(whole, chardata))
+    ]
+    rows: list[list[str] | None] = [None] * len(haystacks)
+    keys = [None] * len(haystacks)
+    cache = _ocr_cache
+    if cache is not None:
+        for row, (_, haystack) in enumerate(haystacks):
+            keys[row] = cache.key(haystack, chardata, masked, engine)
+            rows[row] = cache.get(keys[row])
+
+    pending = [row for row, words in enumerate(rows) if words is None]
+    scores = score_rows(
+        [haystacks[row][1] for row in pending], chardata, masked, engine
+    )
+    for row, (maxima, indices) in zip(pending, scores):
+        rows[row] = assemble_words(maxima, indices, chardata)
+        if cache is not None:
+            cache.put(keys[row], rows[row], chardata)
+
+    results = [[] for _ in regions]
+    for (region, _), words in zip(haystacks, rows):
+        results[region] += words
+    return results
+
+
+def parse_scored_text(
+    region: ndarray,
+    chardata: char_dataset,
+    masked: bool = False,
+    engine: MatchEngine | None = None,
+    threshold: float = 0.95,
+) -> list[ScoredWord]:
+    """
+    Same as parse_text(), but each word comes with the offsets and scores of its glyphs
+    (see `ScoredWord`) -- glyphs scoring `threshold` or less are dropped, so it can be
+    lowered to catch near-misses
+    """
+    region = match_channels(region, chardata)
+    if not ink_columns(region, chardata).any():
+        return []
+    results = [
+        parse_scored_text_row(haystack, chardata, masked, engine, threshold, row)
+        for row, haystack in enumerate(_split_rows(region))
+    ]
+    return list(chain(*results))
+
+
+def parse_scored_text_row(
+    haystack: ndarray,
+    chardata: char_dataset,
+    masked: bool = False,
+    engine: MatchEngine | None = None,
+    threshold: float = 0.95,
+    row: int = 0,
+) -> list[ScoredWord]:
+    """
+    Processes a single row of text -- parse_scored_text() calls this under the hood
+    see `parse_scored_text()` for parameters (`row` is recorded in the words)
+    """
+    if engine is None:
+        engine = _ocr_engine
+    haystack = match_channels(haystack, chardata)
+
+    cache = _ocr_cache
+    if cache is not None:
+        key = cache.key(haystack, chardata, masked, engine) + (threshold, row)
+        words = cache.get(key)
+        if words is not None:
+            return words
+
+    maxima, indices = score_row(haystack, chardata, masked, engine)
+    words = assemble_scored_words(maxima, indices, chardata, threshold, row)
+
+    if cache is not None:
+        cache.put(key, words, chardata)
+    return words
+
+
+def match_known_text(
+    haystack: ndarray,
+    bank: StringBank,
+    masked: bool = False,
+    engine: MatchEngine | None = None,
+) -> str:
+    """
+    Identifies which string of a closed vocabulary is written in a single row of text
+    -- returns "" if none of them are (see `build_string_bank()` for the vocabulary)
+    """
+    if engine is None:
+        engine = _ocr_engine
+    haystack = match_channels(haystack, bank.firsts)
+    # only the glyphs strings can start with are scored across the row, which prunes
+    # the search down to the strings sharing the first character that was found
+    maxima, indices = score_row(haystack, bank.firsts, masked, engine)
+    for x in numpy.flatnonzero(maxima > 0.95):
+        groups = bank.masked_groups if masked else bank.groups
+        candidates, stack = groups[bank.firsts[indices[x]][1]]
+        scores = score_stack(haystack, x, stack)
+        matched = numpy.flatnonzero(scores > 0.95)
+        if len(matched) == 0:
+            continue
+        # a string that is a prefix of the actual text scores just as well, so ties
+        # (within rounding) go to the widest string
+        widths = stack[3]
+        best = max(matched, key=lambda i: (round(scores[i], 3), widths[i]))
+        # ...but the text has to end there too (otherwise it only starts with the string)
+        if not _text_ends(
+            haystack, x + widths[best], bank.everything[masked], bank.firsts
+        ):
+            return ""
+        return bank.strings[candidates[best]]
+    return ""
+
+
+def decode_known_text(
+    haystack: ndarray,
+    trie: VocabularyTrie,
+    masked: bool = False,
+    engine: MatchEngine | None = None,
+) -> str:
+    """
+    Decodes a single row of text glyph by glyph, but only ever considers the characters
+    that can follow what has been decoded so far in a closed vocabulary
+    -- returns "" as soon as the text can't be any of them (see `build_vocabulary_trie()`)
+    Note: only the characters the vocabulary allows are scored, at one position at a
+    time -- about as fast as reading the row character by character on short names,
+    faster on longer ones
+    """
+    haystack = match_channels(haystack, trie.firsts)
+    # the text starts at the first ink, so only the columns a first character could
+    # start at before it are tried (`engine` isn't used, glyphs are scored in stacks)
+    (inked,) = numpy.nonzero(ink_columns(haystack, trie.firsts))
+    if len(inked) == 0:
+        return ""
+    for left in trie.lefts:
+        if left > inked[0]:
+            continue  # the character would start left of the row
+        text = _walk_trie(haystack, trie, int(inked[0]) - left, masked)
+        if text is not None:
+            return text
+    return ""
+
+
+def _walk_trie(
+    haystack: ndarray, trie: VocabularyTrie, x: int, masked: bool, node: int = 0
+):
+    """
+    helper for decode_known_text()
+    -- follows the glyphs at x down the trie, strongest match first, backing up
+    whenever a branch turns out not to be a complete string of the vocabulary
+    -- returns the string decoded, or None if there isn't any
+    """
+    steps = _next_glyphs(haystack, trie, node, x, masked)
+    if " " in trie.children[node]:
+        spaced = trie.children[node][" "]
+        steps += _next_glyphs(haystack, trie, spaced, x + trie.space_width, masked)
+    for next_node, next_x in steps:
+        text = _walk_trie(haystack, trie, next_x, masked, next_node)
+        if text is not None:
+            return text
+
+    # the text has to end here too (otherwise it only starts with a valid string)
+    if trie.terminal[node] is None:
+        return None
+    everything = trie_stack(trie, "".join(sorted(set(trie.glyphs) - {" "})), masked)
+    if not _text_ends(haystack, x, everything, trie.firsts):
+        return None
+    return trie.terminal[node]
+
+
+def _text_ends(
+    haystack: ndarray, x: int, everything: template_stack, chardata: char_dataset
+) -> bool:
+    """
+    helper for match_known_text() and decode_known_text()
+    -- whether the text of a row ends at x: no glyph (of the stacked charset) matches
+    there, and there is no ink (in the colors of `chardata`) anywhere past it
+    """
+    if (score_stack(haystack, x, everything) > 0.95).any():
+        return False
+    return not ink_columns(haystack[:, x:], chardata).any()
+
+
+def _next_glyphs(
+    haystack: ndarray, trie: VocabularyTrie, node: int, x: int, masked: bool
+) -> list[tuple[int, int]]:
+    """
+    helper for decode_known_text()
+    -- scores the characters that can follow a trie node at x (and only those)
+    -- returns (next node, next x) of every match, strongest (then widest) first
+    """
+    chars = "".join(char for char in trie.children[node] if char != " ")
+    if chars == "":
+        return []
+    stack = trie_stack(trie, chars, masked)
+    scores = score_stack(haystack, x, stack)
+    widths = stack[3]
+    matches = sorted(
+        numpy.flatnonzero(scores > 0.95),
+        key=lambda i: (round(scores[i], 3), widths[i]),
+        reverse=True,
+    )
+    return [(trie.children[node][chars[i]], x + widths[i]) for i in matches]
+
+
+def assemble_words(maxima: ndarray, indices: ndarray, chardata: char_dataset):
+    """
+    Turns the scores of a row (see `score_row()`) into the words written in it
+    -- matches overlapping an earlier match are discarded, and words are split
+    wherever a position isn't covered by any match
+    """
+    chars, _ = prepared(chardata, _glyph_lookup)
+    _, words = _place_glyphs(maxima, indices, chardata)
+    return ["".join(chars[indices[word]]) for word in words]
+
+
+def assemble_scored_words(
+    maxima: ndarray,
+    indices: ndarray,
+    chardata: char_dataset,
+    threshold: float = 0.95,
+    row: int = 0,
+) -> list[ScoredWord]:
+    """
+    Same as assemble_words(), but keeps where each glyph was matched and how well
+    -- `threshold` can be lowered to also see near-misses (check their confidence)
+    """
+    chars, _ = prepared(chardata, _glyph_lookup)
+    _, words = _place_glyphs(maxima, indices, chardata, threshold)
+    return [
+        ScoredWord(
+            "".join(chars[indices[word]]),
+            row,
+            tuple(word.tolist()),
+            tuple(maxima[word].tolist()),
+        )
+        for word in words
+    ]
+
+
+def _place_glyphs(
+    maxima: ndarray, indices: ndarray, chardata: char_dataset, threshold: float = 0.95
+):
+    """
+    helper for assemble_words()
+    -- returns the x of every glyph kept, and those x split into words
+    """
+    _, char_sizes = prepared(chardata, _glyph_lookup)
+    row_width = len(maxima)
+    # discount matches weaker than the threshold
+    (candidates,) = numpy.nonzero(maxima > threshold)
+    if len(candidates) == 0:
+        return candidates, []
+
+    # first candidate at (or after) each position -- row_width if there are none left
+    following = numpy.full(row_width + 1, row_width)
+    following[candidates] = candidates
+    following = numpy.minimum.accumulate(following[::-1])[::-1]
+    # each match blocks out its full width, so the next match is the first candidate
+    # after it ends -- this only steps once per character that is actually kept
+    following, spans = following.tolist(), char_sizes[indices].tolist()
+    starts = []
+    x = following[0]
+    while x < row_width:
+        starts.append(x)
+        x = following[min(x + spans[x], row_width)]
+    starts = numpy.array(starts)
+    ends = starts + char_sizes[indices[starts]]
+
+    # a gap between matches ends a word (and a word still going at the end of the
+    # row is never ended, so it doesn't count -- it may have been cut off)
+    breaks = numpy.flatnonzero(starts[1:] > ends[:-1]) + 1
+    words = numpy.split(starts, breaks)
+    if ends[-1] >= row_width:
+        words.pop()
+    return starts, words
+
+
+def _glyph_lookup(chardata: char_dataset):
+    """helper for assemble_words() -- the characters and widths of a char_dataset as arrays"""
+    atlas = glyph_atlas(chardata)
+    return atlas.chars, atlas.widths
+
+
+class OCRCache:
+    """
+    bounded cache of parsed rows of text -- keyed by a hash of the row's pixels and the
+    charset it was parsed with, evicting the least recently used row when it is full
+    (scored rows have the threshold and row appended to their key)
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        """most rows held at once"""
+        self.hits = 0
+        """how many rows were returned without being parsed"""
+        self.misses = 0
+        """how many rows had to be parsed"""
+        # each row holds on to its charset, which keeps the id in its key from being
+        # reused by another object (see `prepared()`)
+        self._rows: OrderedDict[tuple, tuple[char_dataset, list]] = OrderedDict()
+        self._lock = Lock()  # rows may be parsed on worker threads
+
+    def __repr__(self):
+        rows, hits, misses = len(self._rows), self.hits, self.misses
+        return f"OCRCache(size={self.size}, {rows=}, {hits=}, {misses=})"
+
+    @staticmethod
+    def key(
+        haystack: ndarray, chardata: char_dataset, masked: bool, engine: MatchEngine
+    ) -> tuple:
+        """identifies a row of pixels parsed with a specific charset"""
+        digest = hashlib.blake2b(haystack.tobytes(), digest_size=16).digest()
+        return digest, haystack.shape, id(chardata), masked, engine
+
+    def get(self, key: tuple) -> list | None:
+        """returns (a copy of) the words cached for the key -- None if not cached"""
+        with self._lock:
+            cached = self._rows.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._rows.move_to_end(key)  # most recently used
+            return list(cached[1])
+
+    def put(self, key: tuple, words: list, chardata: char_dataset):
+        """
+        caches the words parsed for the key with a charset (evicting the least recently
+        used row)
+        """
+        with self._lock:
+            self._rows[key] = chardata, list(words)
+            self._rows.move_to_end(key)
+            while len(self._rows) > self.size:
+                self._rows.popitem(last=False)
+
+
+def background_visible(
+    region: ndarray,
+    pixels: tuple[ndarray, ndarray],
+    background: ndarray,
+    tolerance: int = 8,
+) -> bool:
+    """
+    Checks if a few pixels of a region (which text never covers) are all its background
+    color, which is much cheaper than parsing it to find out that there's no text box
+    -- `pixels` are (rows, columns) index arrays, `tolerance` is per channel
+    """
+    samples = region[pixels].astype(numpy.int16)
+    return bool((numpy.abs(samples - background) <= tolerance).all())
+
+
+class IncrementalReader:
+    """
+    reads a region whose text is revealed left to right over many frames (like dialog)
+    -- remembers the scores of each row, and as long as the columns inked last time are
+    unchanged, only the positions that can see new columns are scored again
+    """
+
+    def __init__(self, chardata: char_dataset, masked: bool = False):
+        self.chardata = chardata
+        """the glyphs the region is read with"""
+        self.masked = masked
+        """whether glyphs are only compared under their masks"""
+        self.resumed = 0
+        """how many rows only had their new columns scored"""
+        self.restarted = 0
+        """how many rows had to be scored from scratch"""
+        # (pixels, inked extent, maxima, indices) of each row when it was last read
+        self._rows: list[tuple[ndarray, int, ndarray, ndarray] | None] = []
+
+    def __repr__(self):
+        resumed, restarted = self.resumed, self.restarted
+        return f"IncrementalReader({resumed=}, {restarted=})"
+
+    def reset(self):
+        """forgets every row, so the next read scores the region from scratch"""
+        self._rows = []
+
+    def read(self, region: ndarray, engine: MatchEngine | None = None) -> list[str]:
+        """returns the same words parse_text() would (see `parse_text()` for parameters)"""
+        if engine is None:
+            engine = _ocr_engine
+        region = match_channels(region, self.chardata)
+        if not ink_columns(region, self.chardata).any():
+            self.reset()  # the text was cleared
+            return []
+        haystacks = _split_rows(region)
+        if len(self._rows) != len(haystacks):
+            self._rows = [None] * len(haystacks)
+        words = []
+        for row, haystack in enumerate(haystacks):
+            maxima, indices = self._score(row, haystack, engine)
+            words += assemble_words(maxima, indices, self.chardata)
+        return words
+
+    def _score(self, row: int, haystack: ndarray, engine: MatchEngine):
+        """helper for read() -- scores a row, reusing its last scores where possible"""
+        last = self._rows[row]
+        if last is not None and numpy.array_equal(haystack, last[0]):
+            self.resumed += 1
+            return last[2], last[3]  # nothing new was revealed
+        (inked,) = numpy.nonzero(ink_columns(haystack, self.chardata))
+        extent = inked[-1] + 1 if len(inked) else 0
+        if last is not None and numpy.array_equal(
+            haystack[:, : last[1]], last[0][:, : last[1]]
+        ):
+            _, old_extent, maxima, indices = last
+            # a window that ends inside the old inked columns can't have changed
+            widest = int(glyph_atlas(self.chardata).widths.max())
+            start = max(0, old_extent - widest + 1)
+            maxima, indices = maxima.copy(), indices.copy()
+            maxima[start:], indices[start:] = score_row(
+                haystack[:, start:], self.chardata, self.masked, engine
+            )
+            self.resumed += 1
+        else:
+            maxima, indices = score_row(haystack, self.chardata, self.masked, engine)
+            self.restarted += 1
+        self._rows[row] = haystack.copy(), extent, maxima, indices
+        return maxima, indices
+
+
+_ocr_engine: MatchEngine = MatchEngine.BATCHED
+
+
+def set_ocr_engine(engine: MatchEngine):
+    """Sets which glyph scoring engine is used when parsing doesn't request one"""
+    global _ocr_engine
+    _ocr_engine = engine
+
+
+class VocabularyMode(Enum):
+    """
+    different ways of reading text that can only be one of a closed vocabulary
+    """
+
+    DECODE = 0
+    """parse the text glyph by glyph, and then check if it is in the vocabulary"""
+    DICTIONARY = 1
+    """match pre-rendered strings of the vocabulary directly (see `match_known_text()`)"""
+    TRIE = 2
+    """decode only characters that are valid so far (see `decode_known_text()`)"""
+
+
+@dataclass
+class Vocabulary:
+    """a closed set of strings, prepared for each VocabularyMode"""
+
+    strings: set[str]
+    """every valid string"""
+
+    bank: StringBank
+    """every valid string pre-rendered (see VocabularyMode.DICTIONARY)"""
+
+    trie: VocabularyTrie
+    """character trie of every valid string (see VocabularyMode.TRIE)"""
+
+
+def build_vocabulary(
+    strings: set[str], chardata: char_dataset, background: ndarray, space_width: int
+) -> Vocabulary:
+    """prepares a vocabulary for reading with the glyphs of a char_dataset"""
+    return Vocabulary(
+        strings,
+        build_string_bank(strings, chardata, background, space_width),
+        build_vocabulary_trie(strings, chardata, space_width),
+    )
+
+
+_vocabulary_mode: VocabularyMode = VocabularyMode.DECODE
+
+
+def set_vocabulary_mode(mode: VocabularyMode):
+    """Sets how text from a closed vocabulary (locations/species) is read"""
+    global _vocabulary_mode
+    _vocabulary_mode = mode
+
+
+def vocabulary_mode() -> VocabularyMode:
+    """the mode set up by set_vocabulary_mode()"""
+    return _vocabulary_mode
+
+
+_ocr_cache: OCRCache | None = None
+
+
+def set_ocr_cache_size(size: int):
+    """
+    Sets how many parsed rows of text are cached (see `OCRCache`)
+    -- 0 (or less) disables the cache so every row is parsed
+    """
+    global _ocr_cache
+    _ocr_cache = OCRCache(size) if size > 0 else None
+
+
+def ocr_cache() -> OCRCache | None:
+    """the cache set up by set_ocr_cache_size() -- None when disabled"""
+    return _ocr_cache
+
+
+_ocr_executor: ThreadPoolExecutor | None = None
+
+
+def set_ocr_workers(workers: int):
+    """
+    Sets how many threads text regions/rows are parsed on
+    -- 1 (or less) parses everything serially on the calling thread
+    """
+    global _ocr_executor
+    if _ocr_executor is not None:
+        _ocr_executor.shutdown(wait=False)
+    _ocr_executor = ThreadPoolExecutor(workers) if workers > 1 else None
+
+
+def ocr_executor() -> ThreadPoolExecutor | None:
+    """the executor set up by set_ocr_workers() -- None when parsing serially"""
+    return _ocr_executor
+
+
 ### MODEL TYPES
 
 
@@ -205,6 +811,18 @@ class TrackerState:
     encounters_updated: bool = field(default=False, repr=False)
     """purely for housekeeping -- update encounters to track wild encounters once"""
 
+    fingerprint: tuple | None = field(default=None, repr=False)
+    """purely for housekeeping -- checksums of the text regions in the last processed frame"""
+
+    skipped_frames: int = field(default=0, repr=False)
+    """how many captured frames were skipped because their text regions didn't change"""
+
+    dialog_visible: bool = field(default=False, repr=False)
+    """whether a dialog box was on screen in the last processed frame"""
+
+    dialog_reader: IncrementalReader | None = field(default=None, repr=False)
+    """reads the dialog box incrementally as it is revealed -- None to parse it fully"""
+
     ### stuff that will be stored when saving state on exit
 
     location: loc_t = field(default="???", repr=True)
@@ -317,6 +935,17 @@ bold = "\033[1m"
 italic = "\033[3m"
 
 
+def load_config(section: str):
+    """loads a section of `config.json` -- falls back to `config.defaults.json` if missing"""
+    try:
+        config = json.load(open("config.json")).get(section)
+    except:
+        config = None
+    if config is None:
+        config = json.load(open("config.defaults.json")).get(section)
+    return config
+
+
 def dbg(category, item, override=False):
     if override or (item is not None and item.__str__() != ""):
         print(f"{bold}{category}: {reset} {item}")
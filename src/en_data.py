@@ -1,6 +1,7 @@
 import numpy
 from en_fontmap import normal_fontmap, bold_fontmap
-from font import palette_transfer, char_dataset
+from font import palette_transfer, char_dataset, load_confusion, measured_order
+from common import ViewType, build_vocabulary
 
 ### minimal sets of chars that can be useful in general
 lower_alpha = set("abcdefghijklmnopqrstuvwxyz")
@@ -23,6 +24,11 @@ locations_chardata: char_dataset = palette_transfer(
     locations_charset,
     normal_fontmap,
     locations_palette,
+    luminance=True,  # text colors are distinct in luminance
+)
+# least ambiguous glyphs first, as measured (read masked, see text_regions)
+locations_chardata = measured_order(
+    locations_chardata, load_confusion(locations_chardata, masked=True)
 )
 
 dialog_palette = [
@@ -35,8 +41,10 @@ dialog_charset = alphabet | numbers | set("&é")
 dialog_chardata: char_dataset = palette_transfer(
     dialog_charset,
     normal_fontmap,
-    locations_palette,
+    dialog_palette,
+    luminance=True,  # text colors are distinct in luminance
 )
+dialog_chardata = measured_order(dialog_chardata, load_confusion(dialog_chardata))
 
 species_palette = [
     numpy.array([0x59, 0x71, 0x69], dtype=numpy.uint8),
@@ -49,7 +57,9 @@ species_chardata: char_dataset = palette_transfer(
     species_charset,
     normal_fontmap,
     species_palette,
+    luminance=True,  # text colors are distinct in luminance
 )
+species_chardata = measured_order(species_chardata, load_confusion(species_chardata))
 
 # something that uses bold_fontmap (like level, gender)
 # etc ...
@@ -809,3 +819,69 @@ class valids:
             "Arceus",
         ]
     )
+
+
+# width of the (unlabeled) whitespace glyph in the international font (index 477)
+space_width = 4
+
+# valid strings prepared for reading directly (see VocabularyMode)
+locations_vocabulary = build_vocabulary(
+    valids.locations, locations_chardata, locations_palette[0], space_width
+)
+species_vocabulary = build_vocabulary(
+    valids.species, species_chardata, species_palette[0], space_width
+)
+
+# where text is read from on screen: (rows, columns, chardata, masked, vocabulary)
+text_regions = {
+    "dialog": (slice(152, 184), slice(16, 232), dialog_chardata, False, None),
+    "location": (
+        slice(16, 32),
+        slice(8, 120),
+        locations_chardata,
+        True,
+        locations_vocabulary,
+    ),
+    # singles alignment
+    "species": (
+        slice(24, 40),
+        slice(2, 62),
+        species_chardata,
+        False,
+        species_vocabulary,
+    ),
+    # doubles alignment
+    "species_left": (
+        slice(33, 49),
+        slice(2, 62),
+        species_chardata,
+        False,
+        species_vocabulary,
+    ),
+    "species_right": (
+        slice(4, 20),
+        slice(8, 68),
+        species_chardata,
+        False,
+        species_vocabulary,
+    ),
+}
+
+# which regions (besides the dialog box) are read in each view type
+view_regions = {
+    ViewType.PC_BOX: [],
+    ViewType.OVERWORLD: ["location"],
+    ViewType.TRAINER_SINGLE: ["species"],
+    ViewType.WILD_SINGLE: ["species"],
+    ViewType.TRAINER_DOUBLE: ["species_left", "species_right"],
+    ViewType.WILD_DOUBLE: ["species_left", "species_right"],
+}
+
+# pixels of the dialog region no glyph ever inks (the top row of each line of text),
+# sampled across its width -- whenever a dialog box is on screen, all of them are its
+# background color (see `background_visible()`)
+dialog_box_pixels = (
+    numpy.repeat([1, 17], 8),
+    numpy.tile(numpy.linspace(0, 215, 8, dtype=int), 2),
+)
+dialog_box_background = dialog_palette[0]
@@ -1,4 +1,5 @@
 import numpy
+import zlib
 from en_data import *
 from common import *
 
@@ -115,20 +116,82 @@ def process_dialog(state: TrackerState, dialog: list[str]):
     pass
 
 
+def frame_changed(state: TrackerState, frame: numpy.ndarray) -> bool:
+    """
+    Checks if any text region the current view type reads has changed since the last
+    frame this was called on -- the frame only needs to be processed if this is true
+    Note: state will be mutated (fingerprint and skipped frame count)
+    """
+    # only the regions we read matter (the overworld itself is constantly animating)
+    fingerprint = [state.view_type]
+    for name in ["dialog", *view_regions[state.view_type]]:
+        rows, cols, *_ = text_regions[name]
+        fingerprint.append(zlib.crc32(frame[rows, cols].tobytes()))
+    fingerprint = tuple(fingerprint)
+    if fingerprint == state.fingerprint:
+        state.skipped_frames += 1
+        return False
+    state.fingerprint = fingerprint
+    return True
+
+
+def capture_regions(state: TrackerState) -> list[tuple[slice, slice]]:
+    """
+    The (rows, columns) of every text region the current view type reads -- the only
+    parts of the frame that need to be captured (see `FrameCapture.set_regions()`)
+    """
+    return [
+        text_regions[name][:2] for name in ["dialog", *view_regions[state.view_type]]
+    ]
+
+
+def set_incremental_dialog(state: TrackerState, enabled: bool):
+    """
+    Sets whether the dialog box is read incrementally (see `IncrementalReader`) -- only
+    the columns revealed since the last frame are matched while dialog is scrolling
+    Note: state will be mutated
+    """
+    if enabled:
+        _, _, chardata, masked, _ = text_regions["dialog"]
+        state.dialog_reader = IncrementalReader(chardata, masked)
+    else:
+        state.dialog_reader = None
+
+
 def process_frame(state: TrackerState, frame: numpy.ndarray):
     """
     The main function that drives the English tracker model -- should be called on every frame captured
     Note: state will be mutated when appropriate
     """
+    # a few pixel reads tell if there's a dialog box to read at all
+    rows, cols, *_ = text_regions["dialog"]
+    dialog = frame[rows, cols]
+    state.dialog_visible = background_visible(
+        dialog, dialog_box_pixels, dialog_box_background
+    )
+
+    # with worker threads, every region this view type reads is submitted up front -- if
+    # the dialog changes the view type, the other regions are just read when needed
+    names = view_regions[state.view_type]
+    if state.dialog_visible and state.dialog_reader is None:
+        names = ["dialog", *names]
+    reads = _submit_reads(frame, names)
+
     # main dialog box
-    main_dialog = parse_text(frame[152:184, 16:232, :], dialog_chardata)
-    process_dialog(state, main_dialog)
-    # dbg("DIALOG", " ".join(main_dialog))
+    if state.dialog_visible:
+        if state.dialog_reader is not None:
+            main_dialog = state.dialog_reader.read(dialog)
+        else:
+            main_dialog = _read(reads, frame, "dialog")
+        process_dialog(state, main_dialog)
+        # dbg("DIALOG", " ".join(main_dialog))
+    elif state.dialog_reader is not None:
+        state.dialog_reader.reset()  # the box closed
 
     if state.view_type == ViewType.OVERWORLD:
         ## locations
 
-        locat = " ".join(parse_text_row(frame[16:32, 8:120], locations_chardata, True))
+        locat = " ".join(_read(reads, frame, "location"))
         if locat in valids.locations:
             state.location = locat  # update location
             # clearing this ensures that no encounter can be marked with wrong location
@@ -146,7 +209,7 @@ def process_frame(state: TrackerState, frame: numpy.ndarray):
         ## species (singles alignment)
 
         # we consider the left member of tuple to be the singles position
-        left = " ".join(parse_text_row(frame[24:40, 2:62], species_chardata))
+        left = " ".join(_read(reads, frame, "species"))
         match left:
             case "":
                 pass  # shouldn't be changed during animations
@@ -173,8 +236,8 @@ def process_frame(state: TrackerState, frame: numpy.ndarray):
         ## species (doubles alignment)
 
         left, right = (
-            " ".join(parse_text_row(frame[33:49, 2:62], species_chardata)),
-            " ".join(parse_text_row(frame[4:20, 8:68], species_chardata)),
+            " ".join(words)
+            for words in _read_all(reads, frame, ["species_left", "species_right"])
         )
         match left, right:
             case "", "":
@@ -202,6 +265,76 @@ def process_frame(state: TrackerState, frame: numpy.ndarray):
     pass
 
 
+def _submit_reads(frame: numpy.ndarray, names: list[str]):
+    """
+    helper for process_frame()
+    -- submits the named text regions to the OCR executor (see `set_ocr_workers()`)
+    -- returns a dict of functions that join each region's result (empty if serial)
+    """
+    executor = ocr_executor()
+    if executor is None:
+        return dict()
+    reads = dict()
+    for name in names:
+        rows, cols, chardata, masked, vocabulary = text_regions[name]
+        if vocabulary is not None and vocabulary_mode() != VocabularyMode.DECODE:
+            reads[name] = executor.submit(_read_region, frame, name).result
+        else:
+            reads[name] = submit_text(executor, frame[rows, cols], chardata, masked)
+    return reads
+
+
+def _read(reads: dict, frame: numpy.ndarray, name: str) -> list[str]:
+    """
+    helper for process_frame()
+    -- joins the named text region if it was submitted, otherwise reads it right away
+    """
+    if name in reads:
+        return reads[name]()
+    return _read_region(frame, name)
+
+
+def _read_all(reads: dict, frame: numpy.ndarray, names: list[str]) -> list[list[str]]:
+    """
+    helper for process_frame()
+    -- reads several named text regions, matching them in one batch when they are parsed
+    with the same charset (see `parse_text_batch()`), otherwise one at a time
+    """
+    regions = [text_regions[name] for name in names]
+    _, _, chardata, masked, _ = regions[0]
+    if (
+        not any(name in reads for name in names)
+        and all(region[2] is chardata and region[3] == masked for region in regions)
+        and all(
+            region[4] is None or vocabulary_mode() == VocabularyMode.DECODE
+            for region in regions
+        )
+    ):
+        crops = [frame[rows, cols] for rows, cols, *_ in regions]
+        return parse_text_batch(crops, chardata, masked)
+    return [_read(reads, frame, name) for name in names]
+
+
+def _read_region(frame: numpy.ndarray, name: str) -> list[str]:
+    """
+    helper for process_frame()
+    -- reads the words in a named text region (see `set_vocabulary_mode()`)
+    """
+    rows, cols, chardata, masked, vocabulary = text_regions[name]
+    region = frame[rows, cols]
+    match vocabulary_mode():
+        case _ if vocabulary is None:
+            return parse_text(region, chardata, masked)
+        case VocabularyMode.DICTIONARY:
+            text = match_known_text(region, vocabulary.bank, masked)
+        case VocabularyMode.TRIE:
+            text = decode_known_text(region, vocabulary.trie, masked)
+        case _:
+            return parse_text(region, chardata, masked)
+    # only valid strings can be read this way (so there is nothing to split into words)
+    return [text] if text != "" else []
+
+
 ## INPUT EVENT HANDLING
 
 
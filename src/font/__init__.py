@@ -2,7 +2,16 @@
 from .readfont import imload
 from .readfont import substitute_colors
 from .readfont import sort_key
+from .readfont import to_luminance
 from .readfont import palette_transfer
 from .readfont import char_dataset
+from .readfont import render_text
+from .readfont import GlyphAtlas
+from .readfont import pack_atlas
+from .readfont import save_atlas
+from .readfont import load_atlas
 from .readfont import normal_namemap
 from .readfont import bold_namemap
+from .confusion import confusion_matrix
+from .confusion import load_confusion
+from .confusion import measured_order
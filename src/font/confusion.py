@@ -0,0 +1,80 @@
+import hashlib
+from pathlib import Path
+import numpy
+import cv2 as opencv
+from .readfont import char_dataset, pack_atlas
+
+"""
+offline analysis of how alike the glyphs of a charset are
+
+the confusion matrix of a char_dataset is measured once and stored next to the sprites
+(keyed by a digest of the glyphs, so any change to the charset or its palette is measured
+again) -- charsets are ordered by it, least ambiguous glyphs first (see `measured_order()`)
+"""
+
+THRESHOLD = 0.95
+"""score a glyph has to beat to count as matched (the same one the parsers use)"""
+
+
+def confusion_matrix(chardata: char_dataset, masked: bool = False) -> numpy.ndarray:
+    """Scores every glyph on a drawing of every glyph, at every column of the drawing.
+
+    entry [i, j, d] is the TM_CCOEFF_NORMED score of glyph j placed d columns into glyph i
+    (drawn on its own background) -- so anything off the diagonal that scores above the
+    threshold is a glyph that can be mistaken for (part of) another
+
+    `chardata`: the glyphs to measure
+    `masked` (optional): whether glyphs are only compared under their masks
+    """
+    atlas = pack_atlas(chardata)
+    widest = int(atlas.widths.max())
+    matrix = numpy.full((len(chardata), len(chardata), widest), -1, dtype=numpy.float32)
+    for i, (_, _, drawn, drawn_mask) in enumerate(chardata):
+        width = drawn.shape[1]
+        # the drawing is followed by background so every glyph fits at every column
+        colors, counts = numpy.unique(
+            drawn[drawn_mask == 0], axis=0, return_counts=True
+        )
+        canvas = numpy.empty((16, width + widest, drawn.shape[2]), dtype=numpy.uint8)
+        canvas[:] = colors[counts.argmax()] if len(colors) else 0
+        canvas[:, :width] = drawn
+        for j, (_, _, needle, mask) in enumerate(chardata):
+            scores = opencv.matchTemplate(
+                canvas, needle, opencv.TM_CCOEFF_NORMED, None, mask if masked else None
+            ).ravel()[:width]
+            # flat windows are undefined (nan/inf) under a mask, they can't be mistaken
+            matrix[i, j, :width] = numpy.nan_to_num(scores, nan=0, posinf=0, neginf=0)
+    return matrix
+
+
+def load_confusion(
+    chardata: char_dataset, masked: bool = False, directory: str = "sprites"
+) -> numpy.ndarray:
+    """Loads the stored confusion matrix of a charset, measuring (and storing) it if needed
+
+    `directory` (optional): where measured matrices are stored (not stored if it doesn't exist)
+    """
+    atlas = pack_atlas(chardata)
+    digest = hashlib.blake2b(digest_size=8)
+    for array in (atlas.images, atlas.masks, atlas.widths, atlas.chars):
+        digest.update(numpy.ascontiguousarray(array).tobytes())
+    path = Path(directory, f"confusion.{digest.hexdigest()}.{int(masked)}.npy")
+    if path.exists():
+        return numpy.load(path)
+    matrix = confusion_matrix(chardata, masked)
+    if path.parent.is_dir():
+        numpy.save(path, matrix)
+    return matrix
+
+
+def measured_order(chardata: char_dataset, matrix: numpy.ndarray) -> char_dataset:
+    """Reorders a char_dataset by how many other glyphs each glyph can be mistaken for.
+
+    glyphs that match (at the same column) on the fewest other glyphs come first, so when
+    scores tie the least ambiguous glyph wins -- the sort key only breaks ties
+    """
+    aligned = matrix[:, :, 0] > THRESHOLD
+    numpy.fill_diagonal(aligned, False)
+    mistaken = aligned.sum(axis=0)  # how many other glyphs each glyph matches on
+    order = sorted(range(len(chardata)), key=lambda j: (mistaken[j], -chardata[j][0]))
+    return pack_atlas([chardata[j] for j in order]).chardata()
@@ -2,6 +2,9 @@ from PIL import Image
 import numpy
 import cv2 as opencv
 from bidict import bidict
+from dataclasses import dataclass, field
+from pathlib import Path
+
 if __name__ == "__main__":  # script has no parent package
     from readfont_index import normal_namemap, bold_namemap
 else:  # relative import from parent package when loaded as module
@@ -64,31 +67,164 @@ of--the first is a sort key, the second is a single character, the third
 is 3-channel image data, the fourth is a 1-channel mask for said image"""
 
 
+def to_luminance(image: numpy.ndarray) -> numpy.ndarray:
+    """converts 3-channel image data (or a single color) to 1-channel luminance, keeping
+    a channel axis of size 1 so it can be used wherever 3-channel data would be"""
+    pixels = numpy.asarray(image, dtype=numpy.uint8)
+    gray = opencv.cvtColor(pixels.reshape(-1, 1, 3), opencv.COLOR_BGR2GRAY)
+    return gray.reshape(pixels.shape[:-1] + (1,))
+
+
 # note: the fontmap is specific to, and should be supplied by, whatever model is using this function
-def palette_transfer(chars, fontmap, palette: list[numpy.ndarray]) -> char_dataset:
+def palette_transfer(
+    chars, fontmap, palette: list[numpy.ndarray], luminance: bool = False
+) -> char_dataset:
     """Associates requested characters with their image data from the fontmap and remaps palette indices to colors.
 
     `chars`: an iterable of characters for which the relevant data is requested
     `fontmap`: a mapping between characters and image data (typically normal or bold)
     `palette`: a indexed collection of colors (which themselves are 3-vectors)
+    `luminance` (optional): whether to only keep the luminance of the colors, which makes
+    matching a third of the work (see `to_luminance()`, the palette's colors have to stay
+    distinct in it -- raises ValueError if they don't)
     """
+    if luminance:
+        shades = to_luminance(numpy.array(palette)).ravel()
+        if len(set(shades.tolist())) < len(palette):
+            raise ValueError("palette colors aren't distinct in luminance")
     lst = []
     for char in chars:
         raw = imload("sprites/" + fontmap.get(char) + ".png")
+        mapped = substitute_colors(raw, palette)  # palette mapped image
         lst.append(
             (
                 sort_key(raw),  # sorting key
                 char,  # the character itself
-                substitute_colors(raw, palette),  # palette mapped image
+                mapped if not luminance else to_luminance(mapped),  # image
                 numpy.where(raw > 0, numpy.uint8(255), numpy.uint8(0)),  # mask
             )
         )
     # it may be overkill, but the sort makes errors in recognition less likely
-    return sorted(lst, reverse=True)
+    # (and the glyphs are packed together so that they are contiguous in memory)
+    return pack_atlas(sorted(lst, reverse=True)).chardata()
+
+
+def render_text(
+    text: str, chardata: char_dataset, background: numpy.ndarray, space_width: int
+):
+    """Draws a string with the glyphs of a char_dataset -- returns (image, mask) like a glyph's data.
+
+    `text`: the string to draw (spaces are drawn as background, outside of the mask)
+    `chardata`: the glyphs to draw with (raises KeyError if a character is missing)
+    `background`: the background color (which should be index 0 of the glyphs' palette)
+    -- converted to luminance if the glyphs are single-channel
+    `space_width`: how many pixels wide a space is
+    """
+    glyphs = {char: (needle, mask) for _, char, needle, mask in chardata}
+    channels = chardata[0][2].shape[2]
+    if channels == 1:
+        background = to_luminance(background)
+    space = (
+        numpy.full((16, space_width, channels), background, dtype=numpy.uint8),
+        numpy.zeros((16, space_width), dtype=numpy.uint8),
+    )
+    images, masks = zip(*(space if char == " " else glyphs[char] for char in text))
+    return numpy.concatenate(images, axis=1), numpy.concatenate(masks, axis=1)
+
+
+@dataclass
+class GlyphAtlas:
+    """every glyph of a char_dataset packed side by side into one contiguous strip
+
+    glyph i is `images[:, offsets[i] : offsets[i] + widths[i]]` (and the same for masks),
+    so a whole charset is two allocations instead of two per glyph
+    """
+
+    images: numpy.ndarray
+    """image data of every glyph, shape (16, total width, channels)"""
+
+    masks: numpy.ndarray
+    """1-channel masks of every glyph, shape (16, total width)"""
+
+    offsets: numpy.ndarray
+    """x each glyph starts at in the strip (in char_dataset order)"""
+
+    widths: numpy.ndarray
+    """width of each glyph (in char_dataset order)"""
+
+    chars: numpy.ndarray
+    """the character of each glyph (in char_dataset order)"""
+
+    keys: numpy.ndarray
+    """the sort key of each glyph (in char_dataset order)"""
+
+    lookup: dict[str, int] = field(init=False, repr=False)
+    """index of each character's glyph"""
+
+    def __post_init__(self):
+        self.lookup = {char: i for i, char in reversed(list(enumerate(self.chars)))}
+
+    def __len__(self):
+        return len(self.chars)
+
+    def columns(self, indices: numpy.ndarray, width: int) -> numpy.ndarray:
+        """strip columns of some glyphs of the same width, shape (glyphs, width)
+        -- `images[:, columns]` gathers all of them at once"""
+        return self.offsets[indices, numpy.newaxis] + numpy.arange(width)
+
+    def chardata(self) -> char_dataset:
+        """the glyphs as a char_dataset, whose images and masks are views into the strip"""
+        return [
+            (
+                int(self.keys[i]),
+                str(self.chars[i]),
+                self.images[:, self.offsets[i] : self.offsets[i] + self.widths[i]],
+                self.masks[:, self.offsets[i] : self.offsets[i] + self.widths[i]],
+            )
+            for i in range(len(self))
+        ]
+
+
+def pack_atlas(chardata: char_dataset) -> GlyphAtlas:
+    """Packs the glyphs of a char_dataset into a GlyphAtlas (keeping their order)"""
+    widths = numpy.array([needle.shape[1] for _, _, needle, _ in chardata])
+    return GlyphAtlas(
+        numpy.ascontiguousarray(numpy.concatenate([c[2] for c in chardata], axis=1)),
+        numpy.ascontiguousarray(numpy.concatenate([c[3] for c in chardata], axis=1)),
+        numpy.concatenate(([0], numpy.cumsum(widths)[:-1])),
+        widths,
+        numpy.array([char for _, char, _, _ in chardata]),
+        numpy.array([key for key, _, _, _ in chardata]),
+    )
+
+
+_ATLAS_FIELDS = ("images", "masks", "offsets", "widths", "chars", "keys")
+
+
+def save_atlas(atlas: GlyphAtlas, directory: str):
+    """Saves a GlyphAtlas as one .npy file per array (see `load_atlas()`)"""
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for name in _ATLAS_FIELDS:
+        numpy.save(Path(directory, name + ".npy"), getattr(atlas, name))
+
+
+def load_atlas(directory: str, mmap: bool = True) -> GlyphAtlas:
+    """Loads a GlyphAtlas saved by save_atlas() -- raises FileNotFoundError if not found
+
+    `mmap` (optional): whether the arrays are memory-mapped (read-only) instead of read
+    """
+    mode = "r" if mmap else None
+    return GlyphAtlas(
+        *(
+            numpy.load(Path(directory, name + ".npy"), mmap_mode=mode)
+            for name in _ATLAS_FIELDS
+        )
+    )
 
 
 ### functions used for splitting a font file into character sprites
 
+
 def fix_color(content: numpy.ndarray):
     """simply remaps the palette indices 0,1 -> 0 so a transparency mask can be constructed trivially"""
     # color 0 is non-content, color 1 is transparent background, but we don't need that distinction after cropping
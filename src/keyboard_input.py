@@ -1,7 +1,6 @@
 from pynput import keyboard
-from common import bold, reset, dbg
+from common import bold, reset, dbg, load_config
 from collections import deque
-import json
 
 
 event_queue = deque()
@@ -43,14 +42,10 @@ def on_Redo():
     event_queue.append("RedoAction")
 
 
-try:
-    config = json.load(open("config.json")).get("keybinds")
-except:
-    config = json.load(open("config.defaults.json")).get("keybinds")
-finally:
-    print(f"{bold}Configured hotkeys{reset}")
-    for action, keybind in config.items():
-        print(f"  {action}: {bold}{keybind}{reset}")
+config = load_config("keybinds")
+print(f"{bold}Configured hotkeys{reset}")
+for action, keybind in config.items():
+    print(f"  {action}: {bold}{keybind}{reset}")
 
 hotkeys = dict()
 hotkeys[config.get("Send to party")] = on_ToParty
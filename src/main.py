@@ -1,9 +1,12 @@
 import sys
 import numpy
 import cv2 as opencv
-from mss import mss
 import en_model as model
-from common import reset, bold, italic, dbg
+from capture import FrameCapture, PollScheduler
+from common import reset, bold, italic, dbg, load_config, ViewType
+from common import MatchEngine, set_ocr_engine, set_ocr_workers
+from common import set_ocr_cache_size, ocr_cache
+from common import VocabularyMode, set_vocabulary_mode
 from keyboard_input import globalHotkeys, event_queue
 
 
@@ -38,7 +41,6 @@ if __name__ == "__main__":
         scaling = int(sys.argv[5])
         if scaling <= 0:
             raise ValueError
-        scale = 1.00 / scaling
 
     # print explanation of necessary args
     except (IndexError, TypeError):
@@ -48,8 +50,38 @@ if __name__ == "__main__":
 
     # if all args successfully parsed, continue
     else:
-        sct = mss()
+        ocr_config = load_config("ocr")
+        set_ocr_engine(MatchEngine[ocr_config.get("engine", "batched").upper()])
+        set_ocr_workers(ocr_config.get("workers", 1))
+        set_vocabulary_mode(
+            VocabularyMode[ocr_config.get("vocabulary", "decode").upper()]
+        )
+        set_ocr_cache_size(ocr_config.get("cache_size", 0))
+        model.set_incremental_dialog(state, ocr_config.get("incremental_dialog", False))
         bounding_box = {"width": width, "height": height, "left": left, "top": top}
+        capture_config = load_config("capture")
+        capture = FrameCapture(
+            bounding_box, scaling, capture_config.get("ring_size", 2)
+        )
+        # only grab the regions the current view type reads (see `capture_regions()`)
+        roi = capture_config.get("roi", False)
+        # how often frames are captured depends on the view type (see `PollScheduler`)
+        fps = capture_config.get("fps", dict())
+        scheduler = PollScheduler(
+            {
+                view: fps[view.name.lower()]
+                for view in ViewType
+                if view.name.lower() in fps
+            },
+            fps.get("default", 0),
+            fps.get("burst", 0),
+            capture_config.get("burst_seconds", 0),
+        )
+        capture.set_interval(scheduler.interval(state.view_type))
+        last_view = state.view_type
+        if roi:
+            capture.set_regions(model.capture_regions(state))
+        capture.start()
 
         # initialize the tracker display canvas
         canvas = numpy.full((384, 256, 3), model.display_palette[0], dtype=numpy.uint8)
@@ -60,13 +92,16 @@ if __name__ == "__main__":
         last_loc = model.TrackerState(view_type="")  # fake state so it prints initially
 
         while True:
-            gbra = numpy.array(sct.grab(bounding_box))
-            img = gbra[:, :, :3]  # discard alpha from screen capture
-            res = opencv.resize(
-                img, None, fx=scale, fy=scale, interpolation=opencv.INTER_NEAREST
-            )
+            # the freshest frame -- any grabbed while the last one was read are dropped
+            res = capture.latest().image
 
-            model.process_frame(state, res)  # may mutate state
+            # text that hasn't changed since the last frame doesn't need to be read again
+            if model.frame_changed(state, res):  # may mutate state
+                model.process_frame(state, res)  # may mutate state
+                if roi and state.view_type != last_view:
+                    last_view = state.view_type
+                    capture.set_regions(model.capture_regions(state))
+            capture.set_interval(scheduler.interval(state.view_type))
             if event_queue:  # implicitly evaluates false if empty
                 model.handle_event(state, event_queue.popleft())
 
@@ -79,5 +114,11 @@ if __name__ == "__main__":
 
             opencv.imshow("screen", res)
             if (opencv.waitKey(1) & 0xFF) == ord("q"):
+                capture.stop()
+                dbg("CAPTURE", capture)
+                dbg("SCHEDULER", scheduler)
+                dbg("SKIPPED FRAMES", state.skipped_frames)
+                dbg("OCR CACHE", ocr_cache())
+                dbg("DIALOG READER", state.dialog_reader)
                 opencv.destroyAllWindows()
                 break
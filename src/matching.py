@@ -0,0 +1,844 @@
+import cv2 as opencv
+import numpy
+from numpy import ndarray  # to keep annotations shorter
+from numpy.lib.stride_tricks import sliding_window_view
+from enum import Enum
+from collections import deque
+from itertools import chain
+from collections.abc import Callable
+from dataclasses import dataclass, field  # dataclasses are effectively structs
+from font import char_dataset, render_text, GlyphAtlas, pack_atlas
+
+### GLYPH SCORING ENGINES
+# every engine scores a single 16px row against every glyph in a char_dataset and
+# returns (maxima, indices): the strongest score at each x position of the row, and
+# the index (into the char_dataset) of the glyph that scored it
+
+
+class MatchEngine(Enum):
+    """
+    different ways of scoring glyphs against a row of text
+    """
+
+    OPENCV = 0
+    """one opencv.matchTemplate call per glyph (the reference implementation)"""
+    BATCHED = 1
+    """every glyph of the same width is scored in one matrix product over a sliding window view"""
+    PALETTE = 2
+    """glyphs are found by exact comparison of palette indices (needs pixel-exact colors)"""
+    BITCODE = 3
+    """glyphs are decoded in one pass over binarized column codes (needs pixel-exact colors)"""
+    SEGMENT = 4
+    """ink runs between blank columns are looked up by their pixels, falling back to
+    BATCHED for runs that aren't a whole glyph (fastest with pixel-exact colors)"""
+
+
+@dataclass
+class GlyphBank:
+    """glyphs of a char_dataset stacked by width so they can be scored all at once"""
+
+    size: int
+    """number of glyphs in the char_dataset"""
+
+    widths: ndarray
+    """width of each glyph (in char_dataset order)"""
+
+    groups: list[tuple[int, ndarray, ndarray, ndarray]] = field(default_factory=list)
+    """(width, glyph indices, zero-mean templates, template norms) for each glyph width"""
+
+    masked_groups: list[tuple[int, ndarray, ndarray, ndarray, ndarray, ndarray]] = (
+        field(default_factory=list)
+    )
+    """(width, glyph indices, masked zero-mean templates, template norms, masks, mask
+    pixel counts) for each glyph width"""
+
+
+def build_glyph_bank(chardata: char_dataset) -> GlyphBank:
+    """
+    Stacks the glyphs of a char_dataset by width, precomputing everything about the
+    templates that TM_CCOEFF_NORMED would otherwise recompute on every call
+    """
+    atlas = glyph_atlas(chardata)
+    widths = atlas.widths
+    bank = GlyphBank(len(atlas), widths)
+    for width in numpy.unique(widths):
+        indices = numpy.flatnonzero(widths == width)
+        # gathered straight out of the atlas strip, as (glyphs, 16, width, ...)
+        columns = atlas.columns(indices, width)
+        needles = atlas.images[:, columns].transpose(1, 0, 2, 3).astype(numpy.float64)
+        masks = atlas.masks[:, columns].transpose(1, 0, 2) > 0
+
+        # unmasked: per-channel means over the whole template
+        centered = needles - needles.mean(axis=(1, 2), keepdims=True)
+        bank.groups.append(
+            (
+                int(width),
+                indices,
+                centered.reshape(len(indices), -1),
+                numpy.sqrt((centered**2).sum(axis=(1, 2, 3))),
+            )
+        )
+
+        # masked: per-channel means over the pixels under the mask only
+        weights = masks[..., numpy.newaxis].astype(numpy.float64)
+        counts = numpy.maximum(weights.sum(axis=(1, 2), keepdims=True), 1)
+        means = (needles * weights).sum(axis=(1, 2), keepdims=True) / counts
+        centered = (needles - means) * weights
+        bank.masked_groups.append(
+            (
+                int(width),
+                indices,
+                centered.reshape(len(indices), -1),
+                numpy.sqrt((centered**2).sum(axis=(1, 2, 3))),
+                masks.reshape(len(indices), -1).astype(numpy.float64),
+                numpy.maximum(masks.sum(axis=(1, 2)), 1).astype(numpy.float64),
+            )
+        )
+    return bank
+
+
+FLT_EPSILON = numpy.finfo(numpy.float32).eps
+
+_prepared: dict[tuple[int, Callable], tuple[char_dataset, object]] = dict()
+
+
+def prepared(chardata: char_dataset, build: Callable):
+    """returns build(chardata) -- only built the first time it is requested for a char_dataset"""
+    cached = _prepared.get((id(chardata), build))
+    # holding on to chardata keeps its id from being reused by another object
+    if cached is None or cached[0] is not chardata:
+        cached = chardata, build(chardata)
+        _prepared[(id(chardata), build)] = cached
+    return cached[1]
+
+
+def glyph_atlas(chardata: char_dataset) -> GlyphAtlas:
+    """returns the glyphs of a char_dataset packed into an atlas (see `prepared()`)"""
+    return prepared(chardata, pack_atlas)
+
+
+def glyph_bank(chardata: char_dataset) -> GlyphBank:
+    """returns the glyph bank for a char_dataset (see `prepared()`)"""
+    return prepared(chardata, build_glyph_bank)
+
+
+@dataclass
+class PaletteBank:
+    """glyphs of a char_dataset as columns of palette indices, packed into integers"""
+
+    size: int
+    """number of glyphs in the char_dataset"""
+
+    palette: ndarray
+    """every color used by the glyphs, packed as 0xRRGGBB-style integers (sorted)"""
+
+    groups: list[tuple[int, ndarray, ndarray, ndarray]] = field(default_factory=list)
+    """(width, glyph indices, column codes, masked column codes) for each glyph width"""
+
+    masks: list[ndarray] = field(default_factory=list)
+    """bits of each column code that lie under the mask (same order as groups)"""
+
+
+UNKNOWN_COLOR = 0b111
+"""palette index for pixels whose color isn't in the palette (never matches a glyph)"""
+
+
+def _pack_colors(image: ndarray) -> ndarray:
+    """packs the channels of each pixel into a single integer"""
+    pixels = image.astype(numpy.uint32)
+    if pixels.shape[-1] == 1:  # single-channel (see `to_luminance()`)
+        return pixels[..., 0]
+    return (pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]
+
+
+def _pack_columns(indexed: ndarray) -> ndarray:
+    """packs each column of a (16px tall) palette-indexed image into a single integer"""
+    shifts = numpy.arange(indexed.shape[0], dtype=numpy.uint64)[:, numpy.newaxis] * 3
+    return (indexed.astype(numpy.uint64) << shifts).sum(axis=0, dtype=numpy.uint64)
+
+
+def quantize(image: ndarray, palette: ndarray) -> ndarray:
+    """maps each pixel of a 3-channel image to its index in the palette (see `PaletteBank`)"""
+    colors = _pack_colors(image)
+    indices = numpy.searchsorted(palette, colors).clip(0, len(palette) - 1)
+    return numpy.where(palette[indices] == colors, indices, UNKNOWN_COLOR)
+
+
+def build_palette_bank(chardata: char_dataset) -> PaletteBank:
+    """
+    Quantizes the glyphs of a char_dataset to the palette they were drawn with and packs
+    each of their columns into an integer, so glyphs can be found by exact comparison
+    """
+    atlas = glyph_atlas(chardata)
+    palette = numpy.unique(_pack_colors(atlas.images))
+    assert len(palette) < UNKNOWN_COLOR  # palette indices are packed into 3 bits
+    # columns are packed independently, so the whole strip is packed at once
+    strip_codes = _pack_columns(quantize(atlas.images, palette))
+    strip_masks = _pack_columns(numpy.where(atlas.masks > 0, 0b111, 0))
+    bank = PaletteBank(len(atlas), palette)
+    for width in numpy.unique(atlas.widths):
+        indices = numpy.flatnonzero(atlas.widths == width)
+        columns = atlas.columns(indices, width)
+        codes, masks = strip_codes[columns], strip_masks[columns]
+        bank.groups.append((int(width), indices, codes, codes & masks))
+        bank.masks.append(masks)
+    return bank
+
+
+def palette_bank(chardata: char_dataset) -> PaletteBank:
+    """returns the palette bank for a char_dataset (see `prepared()`)"""
+    return prepared(chardata, build_palette_bank)
+
+
+@dataclass
+class GlyphAutomaton:
+    """Aho-Corasick automaton over the (binarized) column codes of a char_dataset's glyphs"""
+
+    ink: ndarray
+    """every color glyphs are drawn in (besides the background), packed and sorted"""
+
+    goto: list[dict[int, int]] = field(default_factory=lambda: [dict()])
+    """transitions from each state on the next column code (state 0 is the root)"""
+
+    fail: list[int] = field(default_factory=lambda: [0])
+    """state to fall back to when a state has no transition for the next column code"""
+
+    found: list[list[int]] = field(default_factory=lambda: [[]])
+    """glyph indices whose columns end at each state (including via fail links)"""
+
+    widths: list[int] = field(default_factory=list)
+    """width of each glyph (in char_dataset order)"""
+
+
+def _binarize_columns(image: ndarray, ink: ndarray) -> ndarray:
+    """packs each column of a (16px tall) image into a 16-bit code of which pixels are ink"""
+    colors = _pack_colors(image)
+    is_ink = numpy.isin(colors, ink).astype(numpy.uint16)
+    shifts = numpy.arange(image.shape[0], dtype=numpy.uint16)[:, numpy.newaxis]
+    return (is_ink << shifts).sum(axis=0, dtype=numpy.uint16)
+
+
+def build_glyph_automaton(chardata: char_dataset) -> GlyphAutomaton:
+    """
+    Builds an Aho-Corasick automaton that recognizes the column codes of every glyph in a
+    char_dataset, so a row can be decoded in a single pass regardless of charset size
+    """
+    ink = numpy.unique(
+        numpy.concatenate(
+            [_pack_colors(needle)[mask > 0] for _, _, needle, mask in chardata]
+        )
+    )
+    automaton = GlyphAutomaton(ink)
+
+    # trie of every glyph's column codes
+    for index, (_, _, needle, _) in enumerate(chardata):
+        automaton.widths.append(needle.shape[1])
+        state = 0
+        for code in _binarize_columns(needle, ink).tolist():
+            if code not in automaton.goto[state]:
+                automaton.goto.append(dict())
+                automaton.fail.append(0)
+                automaton.found.append([])
+                automaton.goto[state][code] = len(automaton.goto) - 1
+            state = automaton.goto[state][code]
+        automaton.found[state].append(index)
+
+    # fail links (breadth-first, so shorter suffixes are always linked first)
+    queue = deque(automaton.goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for code, child in automaton.goto[state].items():
+            queue.append(child)
+            fallback = automaton.fail[state]
+            while fallback and code not in automaton.goto[fallback]:
+                fallback = automaton.fail[fallback]
+            link = automaton.goto[fallback].get(code, 0)
+            automaton.fail[child] = link if link != child else 0
+            automaton.found[child] = automaton.found[child] + automaton.found[link]
+    return automaton
+
+
+def glyph_automaton(chardata: char_dataset) -> GlyphAutomaton:
+    """returns the glyph automaton for a char_dataset (see `prepared()`)"""
+    return prepared(chardata, build_glyph_automaton)
+
+
+@dataclass
+class GlyphSegments:
+    """lookup table from the exact pixels of each glyph to the glyph"""
+
+    palette: ndarray
+    """every color in the glyphs, packed and sorted (see `PaletteBank`)"""
+
+    ink: ndarray
+    """every color glyphs are drawn in (besides the background), packed and sorted"""
+
+    widest: int
+    """width of the widest glyph"""
+
+    widths: list[int] = field(default_factory=list)
+    """width of each glyph (in char_dataset order)"""
+
+    lookup_widths: list[int] = field(default_factory=list)
+    """every glyph width, widest first (the order glyphs are looked up in)"""
+
+    lefts: list[int] = field(default_factory=list)
+    """every number of blank columns a glyph has left of its ink"""
+
+    table: dict[bytes, int] = field(default_factory=dict)
+    """glyph index of each glyph's packed columns (see `_pack_columns()`)"""
+
+
+def build_glyph_segments(chardata: char_dataset) -> GlyphSegments:
+    """
+    Hashes the exact pixels of every glyph of a char_dataset, so a run of touching glyphs
+    can be taken apart one dictionary lookup at a time
+    """
+    atlas = glyph_atlas(chardata)
+    bank = palette_bank(chardata)
+    automaton = glyph_automaton(chardata)
+    segments = GlyphSegments(bank.palette, automaton.ink, int(atlas.widths.max()))
+    segments.widths = atlas.widths.tolist()
+    segments.lookup_widths = sorted(set(segments.widths), reverse=True)
+    lefts = set()
+    for index, (_, _, needle, _) in enumerate(chardata):
+        (inked,) = numpy.nonzero(_binarize_columns(needle, segments.ink))
+        if len(inked) == 0:
+            continue
+        lefts.add(int(inked[0]))
+        key = _pack_columns(quantize(needle, segments.palette)).tobytes()
+        # identical glyphs go to the first one in the char_dataset (like argmax)
+        segments.table.setdefault(key, index)
+    segments.lefts = sorted(lefts)
+    return segments
+
+
+def glyph_segments(chardata: char_dataset) -> GlyphSegments:
+    """returns the glyph segment table for a char_dataset (see `prepared()`)"""
+    return prepared(chardata, build_glyph_segments)
+
+
+template_stack = tuple[ndarray, ndarray, ndarray, ndarray]
+"""(zero-mean templates, template norms, weights, widths) of templates that are scored
+together at a single position -- padded to the widest template (see `stack_templates()`)"""
+
+
+def stack_templates(
+    images: list[tuple[ndarray, ndarray]], masked: bool
+) -> template_stack:
+    """
+    Stacks (image, mask) pairs of glyphs or rendered strings so they can all be scored
+    at a single position at once (see `score_stack()`)
+    """
+    widths = numpy.array([image.shape[1] for image, _ in images])
+    channels = images[0][0].shape[2]
+    centered = numpy.zeros((len(images), 16, widths.max(), channels))
+    weights = numpy.zeros((len(images), 16, widths.max()))
+    for (image, mask), templ, weight, width in zip(images, centered, weights, widths):
+        # padding has no weight, so it never affects the score of a narrower template
+        weight[:, :width] = mask > 0 if masked else 1
+        pixels = image.astype(numpy.float64)
+        under = weight[:, :width, numpy.newaxis]
+        means = (pixels * under).sum(axis=(0, 1)) / max(under.sum(), 1)
+        templ[:, :width] = (pixels - means) * under
+    norms = numpy.sqrt((centered**2).sum(axis=(1, 2, 3)))
+    return (
+        centered.reshape(len(images), -1),
+        norms,
+        weights.reshape(len(images), -1),
+        widths,
+    )
+
+
+def score_stack(haystack: ndarray, x: int, stack: template_stack) -> ndarray:
+    """
+    TM_CCOEFF_NORMED of every template in a stack, placed at x of a single row of text
+    -- templates that would run past the end of the row score the lowest normed score
+    """
+    templs, templ_norms, weights, widths = stack
+    span = widths.max()
+    window = numpy.zeros((haystack.shape[0], span, haystack.shape[2]))
+    visible = haystack[:, x : x + span]
+    window[:, : visible.shape[1]] = visible
+    pixels = window.reshape(-1, haystack.shape[2])
+
+    numerator = templs @ pixels.ravel()
+    channel_sums = weights @ pixels
+    squares = weights @ (pixels**2).sum(axis=1)
+    variance = squares - (channel_sums**2).sum(axis=1) / weights.sum(axis=1)
+    window_norms = numpy.sqrt(numpy.maximum(variance, 0))
+    denominator = window_norms * templ_norms
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        scores = numpy.where(denominator > 0, numerator / denominator, 0)
+    return numpy.where(x + widths <= haystack.shape[1], scores, -1)
+
+
+@dataclass
+class StringBank:
+    """every string of a closed vocabulary pre-rendered as a template, grouped by first character"""
+
+    strings: list[str]
+    """the strings that could be rendered with the char_dataset"""
+
+    groups: dict[str, tuple[ndarray, template_stack]] = field(default_factory=dict)
+    """(string indices, stacked templates) of the strings starting with each character"""
+
+    masked_groups: dict[str, tuple[ndarray, template_stack]] = field(
+        default_factory=dict
+    )
+    """same as groups, but only weighing the pixels under the glyph masks"""
+
+    firsts: char_dataset = field(default_factory=list)
+    """glyphs of every character a string can start with (used to find the start)"""
+
+    everything: dict[bool, template_stack] = field(default_factory=dict)
+    """every glyph of the char_dataset stacked, unmasked and masked (used to find the end)"""
+
+
+def build_string_bank(
+    strings, chardata: char_dataset, background: ndarray, space_width: int
+) -> StringBank:
+    """
+    Renders every string of a vocabulary with the glyphs of a char_dataset (see
+    `render_text()`) -- strings using characters outside the charset are left out
+    """
+    charset = set(char for _, char, _, _ in chardata) | {" "}
+    strings = sorted(string for string in strings if set(string) <= charset)
+    bank = StringBank(strings)
+    for first in sorted(set(string[0] for string in strings)):
+        indices = numpy.array([i for i, s in enumerate(strings) if s[0] == first])
+        rendered = [
+            render_text(strings[i], chardata, background, space_width) for i in indices
+        ]
+        bank.groups[first] = indices, stack_templates(rendered, False)
+        bank.masked_groups[first] = indices, stack_templates(rendered, True)
+    bank.firsts = [glyph for glyph in chardata if glyph[1] in bank.groups]
+    glyphs = [(needle, mask) for _, _, needle, mask in chardata]
+    bank.everything = {False: stack_templates(glyphs, False)}
+    bank.everything[True] = stack_templates(glyphs, True)
+    return bank
+
+
+@dataclass
+class VocabularyTrie:
+    """character trie of a closed vocabulary, with the glyphs needed to walk it"""
+
+    children: list[dict[str, int]] = field(default_factory=lambda: [dict()])
+    """the node each character leads to from each node (node 0 is the root)"""
+
+    terminal: list[str | None] = field(default_factory=lambda: [None])
+    """the string that ends at each node (None if no string ends there)"""
+
+    glyphs: dict[str, tuple[ndarray, ndarray]] = field(default_factory=dict)
+    """(image, mask) of every character in the char_dataset"""
+
+    space_width: int = 0
+    """how many pixels wide a space is"""
+
+    firsts: char_dataset = field(default_factory=list)
+    """glyphs of every character a string can start with (used to find the start)"""
+
+    lefts: list[int] = field(default_factory=list)
+    """every number of blank columns a first character has left of its ink"""
+
+    stacks: dict[tuple[str, bool], template_stack] = field(default_factory=dict)
+    """stacked glyphs of each set of characters scored so far (see `trie_stack()`)"""
+
+
+def build_vocabulary_trie(
+    strings, chardata: char_dataset, space_width: int
+) -> VocabularyTrie:
+    """
+    Builds a character trie of a vocabulary -- strings using characters outside the
+    charset are left out (see `build_string_bank()`)
+    """
+    trie = VocabularyTrie(space_width=space_width)
+    trie.glyphs = {char: (needle, mask) for _, char, needle, mask in chardata}
+    for string in sorted(strings):
+        if not set(string) <= set(trie.glyphs) | {" "}:
+            continue
+        node = 0
+        for char in string:
+            if char not in trie.children[node]:
+                trie.children.append(dict())
+                trie.terminal.append(None)
+                trie.children[node][char] = len(trie.children) - 1
+            node = trie.children[node][char]
+        trie.terminal[node] = string
+    trie.firsts = [glyph for glyph in chardata if glyph[1] in trie.children[0]]
+    trie.lefts = sorted(
+        {int(numpy.flatnonzero(mask.any(axis=0))[0]) for *_, mask in trie.firsts}
+    )
+    return trie
+
+
+def trie_stack(trie: VocabularyTrie, chars: str, masked: bool) -> template_stack:
+    """returns the glyphs of some characters stacked (built the first time only)"""
+    stack = trie.stacks.get((chars, masked))
+    if stack is None:
+        stack = stack_templates([trie.glyphs[char] for char in chars], masked)
+        trie.stacks[(chars, masked)] = stack
+    return stack
+
+
+def _normalize(numerator: ndarray, window_norms: ndarray, templ_norms: ndarray):
+    """divides out the norms the same way TM_CCOEFF_NORMED does (flat windows score 0)"""
+    denominator = window_norms * templ_norms[numpy.newaxis, :]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        scores = numpy.where(denominator > 0, numerator / denominator, 0)
+    return numpy.clip(scores, -1, 1)
+
+
+def score_row_opencv(haystack: ndarray, chardata: char_dataset, masked: bool = False):
+    """scores every glyph with its own opencv.matchTemplate call -- see `score_row()`"""
+    char_scores = []
+    # iterate over characters, associate them with match scores
+    for _, char, needle, mask in chardata:
+        score = opencv.matchTemplate(
+            haystack, needle, opencv.TM_CCOEFF_NORMED, None, mask if masked else None
+        ).flat  # vertical axis is unnecessary, row height is fixed
+        char_scores.append(
+            # fixing the size to be consistent (pad with lowest normed score)
+            numpy.pad(score, (0, needle.shape[1] - 1), constant_values=-1)
+        )
+    char_scores = numpy.array(char_scores)
+    # get indices of strongest char match in each position
+    return char_scores.max(axis=0), char_scores.argmax(axis=0)
+
+
+def _masked_window_norms(
+    windows: ndarray, channels: int, masks: ndarray, counts: ndarray
+) -> ndarray:
+    """
+    helper for score_row_batched()
+    -- the norm of every window under every glyph's mask, shape (positions, glyphs)
+    -- masks are binary, so every sum under them is a plain matrix product
+    """
+    positions = windows.shape[0]
+    # (positions * channels, height * width) so each channel is summed by the same product
+    planes = windows.reshape(positions, -1, channels).transpose(0, 2, 1)
+    planes = planes.reshape(positions * channels, -1)
+    channel_sums = (planes @ masks.T).reshape(positions, channels, -1)
+    squares = (planes**2).reshape(positions, channels, -1).sum(axis=1) @ masks.T
+    variance = squares - (channel_sums**2).sum(axis=1) / counts
+    return numpy.sqrt(numpy.maximum(variance, 0))
+
+
+def _integral_columns(pixels: ndarray) -> ndarray:
+    """
+    helper for score_row_batched()
+    -- running sums of a row's columns (per channel), shape (row width + 1, channels)
+    """
+    columns = pixels.sum(axis=0)
+    return numpy.concatenate(
+        (numpy.zeros((1, columns.shape[1])), columns.cumsum(axis=0))
+    )
+
+
+def score_row_batched(haystack: ndarray, chardata: char_dataset, masked: bool = False):
+    """scores all glyphs of each width in a single matrix product -- see `score_row()`"""
+    bank = glyph_bank(chardata)
+    height, row_width, channels = haystack.shape
+    pixels = haystack.astype(numpy.float64)
+    # lowest normed score wherever a glyph doesn't fit (same as the opencv padding)
+    char_scores = numpy.full((bank.size, row_width), -1, dtype=numpy.float32)
+    # integral images of the row's columns, so the (unmasked) sums of a window of any
+    # width are the difference of two entries -- shared by every glyph width
+    sums = _integral_columns(pixels)
+    square_sums = _integral_columns(pixels**2).sum(axis=1)
+
+    for group in bank.masked_groups if masked else bank.groups:
+        width, indices, templs, templ_norms = group[:4]
+        if width > row_width:
+            continue
+        # (positions, height * width * channels) -- same layout as the flattened templates
+        windows = sliding_window_view(pixels, width, axis=1).transpose(1, 0, 3, 2)
+        windows = windows.reshape(windows.shape[0], -1)
+        positions = windows.shape[0]
+        numerator = windows @ templs.T
+
+        if masked:
+            masks, counts = group[4:]
+            window_norms = _masked_window_norms(windows, channels, masks, counts)
+            scores = _normalize(numerator, window_norms, templ_norms)
+        else:
+            squares = square_sums[width:] - square_sums[:-width]
+            channel_sums = sums[width:] - sums[:-width]
+            variance = squares - (channel_sums**2).sum(axis=1) / (height * width)
+            # mirrors the rounding guard opencv uses for (nearly) flat windows
+            flat = variance <= numpy.minimum(0.5, 10 * FLT_EPSILON * squares)
+            window_norms = numpy.where(flat, 0, numpy.sqrt(numpy.maximum(variance, 0)))
+            scores = _normalize(numerator, window_norms[:, numpy.newaxis], templ_norms)
+
+        char_scores[indices, :positions] = scores.T
+
+    # get indices of strongest char match in each position
+    return char_scores.max(axis=0), char_scores.argmax(axis=0)
+
+
+def score_row_palette(haystack: ndarray, chardata: char_dataset, masked: bool = False):
+    """scores glyphs by exact comparison of palette indices -- see `score_row()`"""
+    bank = palette_bank(chardata)
+    row_width = haystack.shape[1]
+    # the row is quantized (and packed into column codes) once for every glyph
+    columns = _pack_columns(quantize(haystack, bank.palette))
+    # exact matches score 1, anything else scores the lowest normed score
+    char_scores = numpy.full((bank.size, row_width), -1, dtype=numpy.float32)
+
+    for (width, indices, codes, masked_codes), masks in zip(bank.groups, bank.masks):
+        if width > row_width:
+            continue
+        windows = sliding_window_view(columns, width)[:, numpy.newaxis, :]
+        if masked:
+            found = ((windows & masks) == masked_codes).all(axis=2)
+        else:
+            found = (windows == codes).all(axis=2)
+        char_scores[indices, : found.shape[0]] = numpy.where(found.T, 1, -1)
+
+    # get indices of strongest char match in each position
+    return char_scores.max(axis=0), char_scores.argmax(axis=0)
+
+
+def score_row_bitcode(haystack: ndarray, chardata: char_dataset, masked: bool = False):
+    """
+    scores glyphs by running the row's binarized column codes through an automaton -- see
+    `score_row()` (the mask is ignored: background pixels never count as ink either way)
+    """
+    automaton = glyph_automaton(chardata)
+    goto, fail, found = automaton.goto, automaton.fail, automaton.found
+    # exact matches score 1, anything else scores the lowest normed score
+    maxima = numpy.full(haystack.shape[1], -1, dtype=numpy.float32)
+    indices = numpy.zeros(haystack.shape[1], dtype=numpy.int64)
+
+    state = 0
+    for x, code in enumerate(_binarize_columns(haystack, automaton.ink).tolist()):
+        while state and code not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(code, 0)
+        for i in found[state]:
+            start = x - automaton.widths[i] + 1
+            # ties go to the first glyph in the char_dataset (like argmax)
+            if maxima[start] < 1 or i < indices[start]:
+                maxima[start], indices[start] = 1, i
+    return maxima, indices
+
+
+def score_row_segment(haystack: ndarray, chardata: char_dataset, masked: bool = False):
+    """
+    scores glyphs by splitting the row into runs of inked columns, and taking each run
+    apart by looking up its glyphs one at a time (see `GlyphSegments`) -- runs that can't
+    be taken apart are scored together in one score_row_batched() pass instead
+    """
+    segments = glyph_segments(chardata)
+    row_width = haystack.shape[1]
+    # exact matches score 1, anything else scores the lowest normed score
+    maxima = numpy.full(row_width, -1, dtype=numpy.float32)
+    indices = numpy.zeros(row_width, dtype=numpy.int64)
+
+    pixels = quantize(haystack, segments.palette)
+    codes = _pack_columns(pixels)
+    # runs are found by the same tolerance as everywhere else, so off colors fall back
+    inked = numpy.concatenate(([0], ink_columns(haystack, chardata) > 0, [0]))
+    edges = numpy.flatnonzero(numpy.diff(inked)).tolist()
+    # columns with colors outside the palette can't be part of any glyph
+    unknown = numpy.concatenate(([0], (pixels == UNKNOWN_COLOR).any(axis=0).cumsum()))
+    # (start, stop) of the positions around runs that couldn't be taken apart
+    failed = []
+    for start, stop in zip(edges[::2], edges[1::2]):
+        if unknown[stop] > unknown[start]:
+            failed.append((max(0, start - segments.widest + 1), stop))
+            continue
+        for left in segments.lefts:
+            placed = _take_apart(codes, segments, start - left, stop)
+            if placed is not None:
+                for x, index in placed:
+                    maxima[x], indices[x] = 1, index
+                break
+        else:
+            # off colors, or glyphs that don't line up with the run
+            failed.append((max(0, start - segments.widest + 1), stop))
+    if not failed:
+        return maxima, indices
+
+    # the spans that failed are scored in a single batched pass over the columns they
+    # cover (one call costs much less than one per span, even with columns in between)
+    low, high = failed[0][0], min(row_width, failed[-1][1] + segments.widest - 1)
+    span_maxima, span_indices = score_row_batched(
+        haystack[:, low:high], chardata, masked
+    )
+    for start, stop in failed:
+        maxima[start:stop] = span_maxima[start - low : stop - low]
+        indices[start:stop] = span_indices[start - low : stop - low]
+    return maxima, indices
+
+
+def _take_apart(codes: ndarray, segments: GlyphSegments, x: int, stop: int):
+    """
+    helper for score_row_segment()
+    -- looks up glyphs one after the other from x until they cover the run ending at stop
+    -- returns the (x, glyph index) of each, or None if a glyph isn't found on the way
+    """
+    placed = []
+    while x < stop:
+        for width in segments.lookup_widths:
+            if x < 0 or x + width > len(codes):
+                continue
+            index = segments.table.get(codes[x : x + width].tobytes())
+            if index is not None:
+                break
+        else:
+            return None
+        placed.append((x, index))
+        x += width
+    return placed
+
+
+INK_TOLERANCE = 32
+"""how far (in every channel) a pixel can be from a glyph's color and still be ink"""
+
+
+def _ink_tables(chardata: char_dataset) -> ndarray:
+    """
+    helper for ink_columns()
+    -- for each channel, a bitmask per value of which glyph colors it is close to
+    """
+    atlas = glyph_atlas(chardata)
+    inks = numpy.unique(atlas.images[atlas.masks > 0], axis=0).astype(numpy.int64)
+    assert len(inks) <= 64  # one bit per color
+    values = numpy.arange(256)[numpy.newaxis, :, numpy.newaxis]
+    near = numpy.abs(values - inks.T[:, numpy.newaxis, :]) <= INK_TOLERANCE
+    bits = numpy.uint64(1) << numpy.arange(len(inks), dtype=numpy.uint64)
+    return (near * bits).sum(axis=2, dtype=numpy.uint64)  # (channels, 256)
+
+
+def ink_columns(region: ndarray, chardata: char_dataset) -> ndarray:
+    """
+    Counts the pixels in each column of a region that are (close to) the color of a glyph
+    -- a region whose columns are all 0 can't contain any text (see `INK_TOLERANCE`)
+    """
+    tables = prepared(chardata, _ink_tables)
+    # a pixel is close to a color only if every one of its channels is
+    near = tables[0][region[..., 0]]
+    for channel in range(1, region.shape[2]):
+        near &= tables[channel][region[..., channel]]
+    return numpy.count_nonzero(near, axis=0)
+
+
+def _inked_runs(inked: ndarray, widest: int) -> list[tuple[int, int]]:
+    """
+    helper for score_row()
+    -- (start, stop) of each run of positions with ink somewhere in their next `widest`
+    columns
+    """
+    seen = numpy.concatenate(([0], numpy.cumsum(inked)))
+    ahead = seen[numpy.minimum(numpy.arange(len(inked)) + widest, len(inked))]
+    sees_ink = numpy.concatenate(([False], ahead > seen[:-1], [False]))
+    edges = numpy.flatnonzero(sees_ink[1:] != sees_ink[:-1])
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def score_row(
+    haystack: ndarray,
+    chardata: char_dataset,
+    masked: bool = False,
+    engine: MatchEngine = MatchEngine.BATCHED,
+):
+    """
+    Scores every glyph in `chardata` at every x position of a single row of text
+
+    `haystack` : a single 16px row of a 3-channel image\n
+    `chardata` : an iterable associating characters with their image/mask data\n
+    `masked` (optional) : whether glyphs should only be compared under their masks\n
+    `engine` (optional) : which scoring engine to use (see `MatchEngine`)\n
+    returns (maxima, indices) -- the strongest score at each position and which glyph scored it
+    """
+    row_width = haystack.shape[1]
+    # lowest normed score wherever there is nothing to match (same as the padding)
+    maxima = numpy.full(row_width, -1, dtype=numpy.float32)
+    indices = numpy.zeros(row_width, dtype=numpy.int64)
+    # only positions whose window (as wide as the widest glyph) sees any ink are scored,
+    # each run of them together -- every window is still the full window so scores
+    # don't change, and a row without ink costs nothing but the ink count
+    widest = int(glyph_atlas(chardata).widths.max())
+    for start, stop in _inked_runs(ink_columns(haystack, chardata) > 0, widest):
+        span = haystack[:, start : min(row_width, stop + widest - 1)]
+        span_maxima, span_indices = _score_span(span, chardata, masked, engine)
+        maxima[start:stop] = span_maxima[: stop - start]
+        indices[start:stop] = span_indices[: stop - start]
+    return maxima, indices
+
+
+def score_rows(
+    haystacks: list[ndarray],
+    chardata: char_dataset,
+    masked: bool = False,
+    engine: MatchEngine = MatchEngine.BATCHED,
+) -> list[tuple[ndarray, ndarray]]:
+    """
+    Scores several rows of text (of any widths) in a single engine call -- the inked spans
+    of every row (see `score_row()`) are laid side by side in one haystack, with blank
+    columns between them, and the scores are split back into (maxima, indices) per row
+    Note: a glyph that would run past the end of its row scores the lowest normed score
+    even if a narrower glyph would have fit (score_row() can tell them apart)
+    """
+    widths = glyph_atlas(chardata).widths
+    widest = int(widths.max())
+    results = []
+    pieces, placements = [], []  # placements: (row, start, stop, x in the batch)
+    x = 0
+    for row, haystack in enumerate(haystacks):
+        row_width = haystack.shape[1]
+        results.append(
+            (
+                numpy.full(row_width, -1, dtype=numpy.float32),
+                numpy.zeros(row_width, dtype=numpy.int64),
+            )
+        )
+        for start, stop in _inked_runs(ink_columns(haystack, chardata) > 0, widest):
+            span = haystack[:, start : min(row_width, stop + widest - 1)]
+            pieces.append(span)
+            placements.append((row, start, stop, x))
+            x += span.shape[1] + widest
+    if not pieces:
+        return results
+
+    # blank columns keep the ink of neighboring spans apart (for the exact engines)
+    blank = prepared(chardata, _glyph_background)
+    separator = numpy.broadcast_to(blank, (pieces[0].shape[0], widest, len(blank)))
+    batch = numpy.concatenate(list(chain(*((p, separator) for p in pieces))), axis=1)
+    batch_maxima, batch_indices = _score_span(batch, chardata, masked, engine)
+    for row, start, stop, x in placements:
+        maxima, indices = results[row]
+        span_maxima = batch_maxima[x : x + stop - start]
+        span_indices = batch_indices[x : x + stop - start]
+        # near the end of a row, windows run into the separator instead of off the row
+        overhang = numpy.arange(start, stop) + widths[span_indices] > len(maxima)
+        maxima[start:stop] = numpy.where(overhang, -1, span_maxima)
+        indices[start:stop] = span_indices
+    return results
+
+
+def _glyph_background(chardata: char_dataset) -> ndarray:
+    """helper for score_rows() -- the most common color outside of the glyph masks"""
+    atlas = glyph_atlas(chardata)
+    colors, counts = numpy.unique(
+        atlas.images[atlas.masks == 0], axis=0, return_counts=True
+    )
+    return colors[counts.argmax()]
+
+
+def _score_span(
+    haystack: ndarray, chardata: char_dataset, masked: bool, engine: MatchEngine
+):
+    """helper for score_row() -- scores a span of the row with the requested engine"""
+    match engine:
+        case MatchEngine.OPENCV:
+            return score_row_opencv(haystack, chardata, masked)
+        case MatchEngine.BATCHED:
+            return score_row_batched(haystack, chardata, masked)
+        case MatchEngine.PALETTE:
+            return score_row_palette(haystack, chardata, masked)
+        case MatchEngine.BITCODE:
+            return score_row_bitcode(haystack, chardata, masked)
+        case MatchEngine.SEGMENT:
+            return score_row_segment(haystack, chardata, masked)